@@ -0,0 +1,284 @@
+#!/bin/python
+
+import argparse
+import base64
+import configparser
+import csv
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pypass import ConfigManager, Importer, NativeBackend, OneTimePassword, PassBackend, PassWrapper, Settings
+
+
+SHAPES = ['plain', 'fields', 'otp', 'ssh', 'pgp', 'mixed']
+
+
+class BenchmarkConfig(ConfigManager):
+    # Default settings kept in memory, the user's config.ini is never touched
+    def __init__(self, store):
+        self.config = configparser.ConfigParser()
+        self.settings = Settings()
+        self.save_timeout = None
+        self.file_path = None
+        self.create_default_config()
+        self.set('Settings', 'password_store_path', store)
+
+    def save(self):
+        pass
+
+
+def key_block(kind, rng, lines=20):
+    body = '\n'.join(base64.b64encode(rng.randbytes(48)).decode() for _ in range(lines))
+    return f'-----BEGIN {kind}-----\n{body}\n-----END {kind}-----'
+
+
+def entry_content(shape, rng):
+    lines = [base64.b64encode(rng.randbytes(18)).decode()]
+    if shape in ('fields', 'mixed'):
+        lines += [f'username: user{rng.randrange(10 ** 6)}', f'url: https://example.invalid/{rng.randrange(10 ** 6)}',
+                  f'email: user{rng.randrange(10 ** 6)}@example.invalid']
+    if shape in ('otp', 'mixed'):
+        secret = base64.b32encode(rng.randbytes(20)).decode().rstrip('=')
+        lines.append(f'otpauth://totp/Example:user?secret={secret}&issuer=Example')
+    if shape in ('ssh', 'mixed'):
+        lines.append(key_block('OPENSSH PRIVATE KEY', rng))
+    if shape in ('pgp', 'mixed'):
+        lines.append(key_block('PGP PRIVATE KEY BLOCK', rng, 60))
+    if shape == 'mixed':
+        lines += ['', 'Some notes about this account.', 'Recovery codes are in the safe.']
+    return '\n'.join(lines) + '\n'
+
+
+def run(command, env, input=None):
+    return subprocess.run(command, env=env, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True).stdout
+
+
+def create_keyring(gnupghome, env):
+    # A throwaway key without passphrase, gpg-agent never needs pinentry
+    os.makedirs(gnupghome, mode=0o700)
+    run(['gpg', '--batch', '--passphrase', '', '--quick-gen-key', 'PyPass Benchmark <benchmark@pypass.invalid>',
+         'default', 'default', 'never'], env)
+    output = run(['gpg', '--with-colons', '--list-keys', 'benchmark@pypass.invalid'], env).decode()
+    return next(line.split(':')[9] for line in output.splitlines() if line.startswith('fpr:'))
+
+
+def folders(depth, width):
+    paths = ['']
+    for level in range(depth):
+        paths = [f'{path}folder{level}-{i}/' for path in paths for i in range(width)]
+    return paths
+
+
+def create_store(store, entries, depth, width, shapes, fingerprint, env, rng):
+    os.makedirs(store)
+    with open(os.path.join(store, '.gpg-id'), 'w') as file:
+        file.write(fingerprint + '\n')
+
+    # Encrypt one entry per shape, the others are copies, encrypting 100k entries would take hours
+    encrypted = {shape: run(['gpg', '--batch', '--yes', '--trust-model', 'always', '-e', '-r', fingerprint],
+                            env, entry_content(shape, rng).encode()) for shape in shapes}
+    paths = folders(depth, width)
+    created = []
+    for i in range(entries):
+        shape = shapes[i % len(shapes)]
+        path = f'{paths[i % len(paths)]}{shape}-{i}'
+        os.makedirs(os.path.dirname(os.path.join(store, path)), exist_ok=True)
+        with open(os.path.join(store, path + '.gpg'), 'wb') as file:
+            file.write(encrypted[shape])
+        created.append((path, shape))
+    return created
+
+
+def measure(callback, samples):
+    timings = []
+    for sample in samples:
+        start = time.perf_counter()
+        callback(sample)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'samples': len(timings),
+        'mean_ms': statistics.fmean(timings),
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'min_ms': timings[0],
+        'max_ms': timings[-1],
+    }
+
+
+def gtk_available():
+    try:
+        from gi.repository import Gtk
+        return Gtk.init_check()
+    except (ImportError, ValueError):
+        return False
+
+
+def benchmark_dialog(pass_manager, contents):
+    from gi.repository import Gtk
+    from pypass_gtk import Dialog
+
+    parent = Gtk.Window()
+    parent.pass_manager = pass_manager
+    dialog = Dialog(parent, 'benchmark', contents[0], pass_manager)
+    return measure(lambda content: dialog.build_grid(content, pass_manager), contents)
+
+
+def rebuild_search_index(pass_manager):
+    pass_manager.search_index = None
+    pass_manager.ensure_search_index()
+
+
+def check_backends(pass_manager, paths, queries, content):
+    # Both backends have to give the same answers on the same store, and read what the other wrote
+    backends = {'pass': PassBackend(pass_manager), 'native': NativeBackend(pass_manager)}
+    mismatches = {'show': [], 'find': [], 'insert': []}
+    for path in paths:
+        outputs = {name: (result.returncode, result.stdout) for name, result in
+                   ((name, backend.show(path)) for name, backend in backends.items())}
+        if outputs['pass'] != outputs['native']:
+            mismatches['show'].append(path)
+    for query in queries:
+        if sorted(backends['pass'].find(query) or []) != sorted(backends['native'].find(query) or []):
+            mismatches['find'].append(query)
+    for writer, reader in (('pass', 'native'), ('native', 'pass')):
+        path = f'conformance/{writer}'
+        backends[writer].insert(path, content.encode())
+        if backends[reader].show(path).stdout != content.encode():
+            mismatches['insert'].append(path)
+        backends[reader].remove(path)
+    return {key: value for key, value in mismatches.items() if value}, backends
+
+
+def benchmark_size(entries, args, env, fingerprint, workdir, rng):
+    store = os.path.join(workdir, f'store-{entries}')
+    # PassWrapper runs pass with the environment of this process
+    env['PASSWORD_STORE_DIR'] = os.environ['PASSWORD_STORE_DIR'] = store
+    start = time.perf_counter()
+    created = create_store(store, entries, args.depth, args.width, args.shapes, fingerprint, env, rng)
+    result = {'entries': entries, 'setup_s': time.perf_counter() - start, 'operations': {}}
+    operations = result['operations']
+
+    pass_manager = PassWrapper(BenchmarkConfig(store))
+    operations['index_build'] = measure(lambda _: pass_manager.reload(), range(args.repeat))
+    sample_folders = ['.'] + sorted({os.path.dirname(path) for path, _ in created if os.path.dirname(path)})[:args.samples]
+    operations['list_passwords'] = measure(pass_manager.list_passwords, sample_folders)
+    operations['list_files'] = measure(lambda _: pass_manager.list_files(), range(args.repeat))
+    queries = [os.path.basename(path)[:6] for path, _ in rng.sample(created, min(args.samples, len(created)))]
+    operations['search_index_build'] = measure(lambda _: rebuild_search_index(pass_manager), range(args.repeat))
+    operations['search'] = measure(pass_manager.search, queries)
+    otp_uris = [entry_content('otp', rng).splitlines()[1] for _ in range(args.samples)]
+    operations['otp_code'] = measure(lambda uri: OneTimePassword(uri).code(), otp_uris)
+
+    # Import goes straight to gpg, it does not need pass
+    export = os.path.join(workdir, f'import-{entries}.csv')
+    with open(export, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'folder', 'username', 'password', 'url', 'notes'])
+        for i in range(args.import_entries):
+            writer.writerow([f'imported-{i}', f'import/folder{i % 10}', f'user{i}',
+                             base64.b64encode(rng.randbytes(18)).decode(), f'https://example.invalid/{i}', 'Some notes.'])
+    importer = Importer(pass_manager)
+    operations['import_dry_run'] = measure(lambda _: importer.dry_run(export), range(1))
+    operations['import'] = measure(lambda _: importer.run(export), range(1))
+    operations['import']['entries'] = args.import_entries
+
+    sample = rng.sample(created, min(args.samples, len(created)))
+    result['backend'] = pass_manager.backend.name
+    if shutil.which('pass') is None:
+        result['skipped'] = {'pass': '`pass` is not installed'}
+        if pass_manager.backend.name == 'pass':
+            return result
+    else:
+        operations['pass_ls'] = measure(lambda folder: run(['pass', 'ls', folder], env), sample_folders[:10])
+        pass_manager.reload()
+        mismatches, backends = check_backends(pass_manager, [path for path, _ in sample] + ['missing'], queries,
+                                              entry_content('mixed', rng))
+        result['conformance'] = mismatches or 'identical'
+        for name, backend in backends.items():
+            operations[f'show_{name}'] = measure(backend.show, [path for path, _ in sample])
+
+    operations['show_password'] = measure(pass_manager.show_password, [path for path, _ in sample])
+    if pass_manager.backend.name == 'native' and pass_manager.decryptor.available():
+        # The same entries decrypted in process and by a gpg process each
+        operations['show_gpgme'] = measure(pass_manager.backend.show, [path for path, _ in sample])
+        pass_manager.decryptor.enabled = False
+        operations['show_gpg'] = measure(pass_manager.backend.show, [path for path, _ in sample])
+        pass_manager.decryptor.enabled = True
+    else:
+        result.setdefault('skipped', {})['show_gpgme'] = 'python3-gpg is not installed'
+    # The audit cache of the user is left alone
+    pass_manager.auditor.cache_path = os.path.join(workdir, f'audit-{entries}.json')
+    operations['audit_full'] = measure(lambda _: pass_manager.auditor.run(full=True), range(1))
+    operations['audit_incremental'] = measure(lambda _: pass_manager.auditor.run(), range(args.repeat))
+    otp_paths = [path for path, shape in sample if shape in ('otp', 'mixed')]
+    if otp_paths and shutil.which('pass') and \
+            subprocess.run(['pass', 'otp', '--help'], env=env, capture_output=True).returncode == 0:
+        operations['get_otp'] = measure(pass_manager.get_otp, otp_paths)
+    else:
+        result.setdefault('skipped', {})['get_otp'] = 'pass-otp is not installed'
+
+    new_paths = [f'benchmark/new-{i}' for i in range(args.samples)]
+    content = entry_content('mixed', rng)
+    operations['add_password'] = measure(lambda path: pass_manager.add_password(path, content), new_paths)
+    operations['remove'] = measure(pass_manager.remove, new_paths)
+
+    if gtk_available():
+        operations['build_grid'] = benchmark_dialog(pass_manager, [pass_manager.show_password(path) for path, _ in sample])
+    else:
+        result.setdefault('skipped', {})['build_grid'] = 'no display for GTK'
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PassWrapper against a synthetic password store.')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma separated store sizes')
+    parser.add_argument('--depth', type=int, default=2, help='folder levels below the store root')
+    parser.add_argument('--width', type=int, default=10, help='sub folders per folder')
+    parser.add_argument('--shapes', default=','.join(SHAPES), help=f'entry contents to cycle through: {", ".join(SHAPES)}')
+    parser.add_argument('--samples', type=int, default=20, help='entries or folders timed per operation')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions of whole-store operations')
+    parser.add_argument('--import-entries', type=int, default=1000, help='entries in the CSV export that is imported')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+    args.shapes = args.shapes.split(',')
+    rng = random.Random(args.seed)
+
+    workdir = tempfile.mkdtemp(prefix='pypass-bench-')
+    # Headless and offline: own keyring and a store without git
+    os.environ['GNUPGHOME'] = os.path.join(workdir, 'gnupg')
+    env = dict(os.environ)
+    try:
+        fingerprint = create_keyring(env['GNUPGHOME'], env)
+        results = {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'gpg': run(['gpg', '--version'], env).decode().splitlines()[0],
+            'arguments': {key: value for key, value in vars(args).items() if key != 'output'},
+            'sizes': [benchmark_size(int(size), args, env, fingerprint, workdir, rng) for size in args.sizes.split(',')],
+        }
+    finally:
+        subprocess.run(['gpgconf', '--kill', 'gpg-agent'], env=env, capture_output=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/bin/python
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+
+from gi.repository import GLib
+
+from pypass import Headless
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    # One JSON request per line, answered by one JSON line
+    MAX_REQUEST = 65536
+
+    def handle(self):
+        if not self.server.same_user(self.request):
+            return
+        while True:
+            line = self.rfile.readline(self.MAX_REQUEST)
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+                response = self.server.headless.handle(request) if isinstance(request, dict) else \
+                    {'error': "A request has to be a JSON object"}
+            except ValueError:
+                response = {'error': "A request has to be a JSON object"}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class Daemon(socketserver.ThreadingUnixStreamServer):
+    """Serves Headless requests on a Unix socket from a warm index and decrypt cache.
+
+    The socket lives in a folder only the user can open and only answers
+    processes of the same user. The store is watched on a GLib main loop
+    while clients are served on threads.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, headless: Headless, socket_path: str):
+        self.headless = headless
+        self.socket_path = socket_path
+        os.makedirs(os.path.dirname(socket_path), mode=0o700, exist_ok=True)
+        os.chmod(os.path.dirname(socket_path), 0o700)
+        if Headless.forward({'command': 'list', 'folder': '.'}, socket_path) is not None:
+            raise OSError(f"A daemon is already listening on {socket_path}")
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, DaemonHandler)
+        finally:
+            os.umask(umask)
+
+    @staticmethod
+    def same_user(connection) -> bool:
+        if not hasattr(socket, 'SO_PEERCRED'):
+            return True  # The folder permissions keep others out
+        credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', credentials)
+        return uid == os.getuid()
+
+    def run(self) -> None:
+        pass_manager = self.headless.pass_manager
+        pass_manager.index.ensure()
+        pass_manager.ensure_search_index()
+        pass_manager.watcher.start()
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        print(f"Listening on {self.socket_path}")
+
+        loop = GLib.MainLoop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signum, loop.quit)
+        try:
+            loop.run()
+        finally:
+            self.shutdown()
+            self.server_close()
+            os.remove(self.socket_path)
+            pass_manager.watcher.stop()
+            pass_manager.decrypt_pool.shutdown()
+            pass_manager.runner.shutdown()
+            pass_manager.sync_engine.flush()
+            pass_manager.save_listing()
+            pass_manager.decrypt_cache.clear()
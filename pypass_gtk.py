@@ -0,0 +1,1508 @@
+#!/bin/python
+
+import collections
+import itertools
+import json
+import os
+import secrets
+import signal
+import string
+import time
+
+import gi
+
+gi.require_version('Gdk', '4.0')
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gdk, Gio, GLib, Gtk
+
+from pypass import (ActionProfiler, Auditor, ConfigManager, Importer, OneTimePassword, PassEntry, PassWrapper,
+                    Reencryptor, StallWatchdog, SyncEngine, startup_elapsed, user_cache_file)
+
+
+class Dialog(Gtk.Window):
+    # Free text lines laid out before a "Show more" button
+    TEXT_LINES = 20
+
+    def __init__(self, parent, title, content, pass_manager):    
+        Gtk.Window.__init__(self, title=title, transient_for=parent, modal=True)
+        self.set_default_size(280, 250)
+        self.pass_manager = pass_manager
+        self.content = content
+        self.tasks = []
+        # Refreshes the TOTP code while the dialog is open
+        self.otp_timeout = None
+
+        # Header
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        self.set_titlebar(header_bar)
+
+        # Shown while the entry is being saved
+        self.spinner = Gtk.Spinner()
+        header_bar.pack_end(self.spinner)
+
+        # Edit or view mode
+        self.edit_mode = False
+        self.edit_button = Gtk.Button()
+        self.edit_button.set_icon_name("document-edit-symbolic")
+        self.edit_button.connect("clicked", self.on_edit_button_clicked)
+        header_bar.pack_start(self.edit_button)
+
+        # Create a stack to manage the two views
+        self.stack = Gtk.Stack()
+        self.stack.set_transition_type(Gtk.StackTransitionType.SLIDE_LEFT_RIGHT)
+
+        # Add the grid view to the stack
+        self.grid_scrolled_window = self.build_grid(content, parent.pass_manager)
+        self.stack.add_titled(self.grid_scrolled_window, "grid", "Grid View")
+        self.stack.set_visible_child_name("grid")
+        self.set_child(self.stack)
+
+        # The text editor is created on the first edit
+        self.edit_view = None
+
+        # Stop fetching anything for this dialog once it is closed
+        self.connect("close-request", self.on_close_request)
+
+    def on_close_request(self, _):
+        for task in self.tasks:
+            task.cancel()
+        if self.otp_timeout:
+            GLib.source_remove(self.otp_timeout)
+            self.otp_timeout = None
+        return False
+
+    def build_grid(self, content: str, pass_manager: PassWrapper) -> Gtk.ScrolledWindow:
+        grid = Gtk.Grid()
+        grid.set_row_spacing(3)
+        grid.set_column_spacing(3)
+        grid.set_halign(Gtk.Align.CENTER)
+        grid.set_valign(Gtk.Align.CENTER)
+        grid.set_margin_start(6)
+        grid.set_margin_end(6)
+        grid.set_margin_top(6)
+        grid.set_margin_bottom(6)
+
+        # Create a scrolled window for the grid view
+        grid_scrolled_window = Gtk.ScrolledWindow()
+        grid_scrolled_window.set_vexpand(True)
+        grid_scrolled_window.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        grid_scrolled_window.set_child(grid)
+
+        entry = PassEntry(content)
+
+        # Handle the first line as the password, values only get a widget once they are shown
+        show_password_button = Gtk.Button(label=self.to_asterisks(entry.password))
+        show_password_button.connect("clicked", self.on_show_button_clicked, self.value_label, entry.password)
+        grid.attach(show_password_button, 0, 0, 2, 1)
+
+        copy_password_button = Gtk.Button()
+        copy_password_button.set_icon_name("edit-copy-symbolic")
+        copy_password_button.connect("clicked", self.on_copy_button_clicked, entry.password)
+        grid.attach(copy_password_button, 2, 0, 1, 1)
+
+        # Check for OTP and display it
+        if self.otp_timeout:
+            GLib.source_remove(self.otp_timeout)
+            self.otp_timeout = None
+        if entry.otp:
+            label_text = Gtk.Label(label="OTP:")
+            otp_label = Gtk.Label(label="…")
+            otp_box = Gtk.Box(spacing=6)
+            otp_box.append(otp_label)
+            try:
+                otp = OneTimePassword(entry.otp)
+            except ValueError:
+                otp = None
+
+            # The code is computed from the decrypted content, no second decrypt by pass otp
+            if otp is None:
+                self.tasks.append(pass_manager.run_async(pass_manager.get_otp, self.get_title(), callback=otp_label.set_label))
+            elif otp.kind == 'totp':
+                countdown_label = Gtk.Label()
+                otp_box.append(countdown_label)
+                self.refresh_totp(otp, otp_label, countdown_label)
+                self.otp_timeout = GLib.timeout_add(1000, self.refresh_totp, otp, otp_label, countdown_label)
+            else:
+                next_button = Gtk.Button(label="Next code")
+                next_button.connect("clicked", self.on_next_code_clicked, otp, otp_label)
+                otp_box.append(next_button)
+
+            copy_button = Gtk.Button()
+            copy_button.set_icon_name("edit-copy-symbolic")
+            copy_button.connect("clicked", self.on_copy_button_clicked, otp_label)
+            grid.attach(label_text,  0, 1, 1, 1)
+            grid.attach(otp_box,     1, 1, 1, 1)
+            grid.attach(copy_button, 2, 1, 1, 1)
+
+        # Fields and runs of free text in the order of the entry, the key blocks below them
+        row = 2
+        for is_text, lines in itertools.groupby(entry.lines, key=lambda line: line[0] is None):
+            if is_text:
+                self.add_text_widget(grid, [value for _, value in lines], row)
+                row += 1
+                continue
+            for label, value in lines:
+                label_widget = Gtk.Label(label=label + ':', halign=Gtk.Align.END)
+                grid.attach(label_widget, 0, row, 1, 1)
+
+                show_button = Gtk.Button(label=self.to_asterisks(value))
+                show_button.connect("clicked", self.on_show_button_clicked, self.value_label, value)
+                grid.attach(show_button, 1, row, 1, 1)
+
+                # Copy button
+                copy_button = Gtk.Button()
+                copy_button.set_icon_name("edit-copy-symbolic")
+                copy_button.connect("clicked", self.on_copy_button_clicked, value)
+                grid.attach(copy_button, 2, row, 1, 1)
+                row += 1
+
+        for kind, block in entry.blocks:
+            self.add_key_widget(grid, kind, block, row)
+            row += 1
+        return grid_scrolled_window
+
+    def refresh_totp(self, otp, otp_label, countdown_label) -> bool:
+        otp_label.set_label(otp.code())
+        countdown_label.set_label(f"{otp.remaining()} s")
+        return GLib.SOURCE_CONTINUE
+
+    def on_next_code_clicked(self, button, otp, otp_label) -> None:
+        old_uri = otp.uri
+        otp_label.set_label(otp.next_code())
+
+        # Store the new counter so the code is not handed out twice
+        self.content = self.content.replace(old_uri, otp.uri, 1)
+        if self.edit_view:
+            self.edit_view.get_buffer().set_text(self.content)
+        self.spinner.start()
+        self.pass_manager.run_async(self.pass_manager.save, self.get_title(), self.content,
+                                    callback=lambda _: self.spinner.stop())
+
+    def add_key_widget(self, grid, kind, key_content, row) -> None:
+        show_button = Gtk.Button(label=f"Show {PassEntry.KEY_NAMES.get(kind, kind.title())}")
+        show_button.connect("clicked", self.on_show_button_clicked, self.key_view, key_content)
+        grid.attach(show_button, 0, row, 2, 1)
+
+        # Copy key
+        copy_button = Gtk.Button()
+        copy_button.set_icon_name("edit-copy-symbolic")
+        copy_button.connect("clicked", self.on_copy_button_clicked, key_content)
+        grid.attach(copy_button, 2, row, 1, 1)
+
+    def add_text_widget(self, grid, lines, row) -> None:
+        # Long notes show their first lines, the rest is laid out when asked for
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        box.append(self.value_label('\n'.join(lines[:self.TEXT_LINES])))
+        if len(lines) > self.TEXT_LINES:
+            more_button = Gtk.Button(label=f"Show {len(lines) - self.TEXT_LINES} more lines")
+            more_button.connect("clicked", self.on_show_button_clicked, self.value_label,
+                                '\n'.join(lines[self.TEXT_LINES:]))
+            box.append(more_button)
+        grid.attach(box, 0, row, 2, 1)
+
+    @staticmethod
+    def value_label(value) -> Gtk.Label:
+        label = Gtk.Label(label=value)
+        label.set_selectable(True)
+        label.set_wrap(True)
+        return label
+
+    @staticmethod
+    def key_view(key_content) -> Gtk.TextView:
+        text_view = Gtk.TextView()
+        text_view.get_buffer().set_text(key_content)
+        text_view.set_wrap_mode(Gtk.WrapMode.NONE)
+        text_view.set_editable(False)
+        return text_view
+
+    def to_asterisks(self, value) -> str:
+        num_asterisks = min(len(value), 25)
+        return "*" * num_asterisks
+
+    def on_show_button_clicked(self, button, create, value) -> None:
+        # The button makes way for the widget showing the value
+        parent = button.get_parent()
+        widget = create(value)
+        if isinstance(parent, Gtk.Grid):
+            column, row, width, height = parent.query_child(button)
+            parent.remove(button)
+            parent.attach(widget, column, row, width, height)
+        else:
+            parent.insert_child_after(widget, button)
+            parent.remove(button)
+
+    def on_copy_button_clicked(self, button, value) -> None:
+        # Values are copied from the entry, the OTP code from its label
+        clipboard = Gdk.Display.get_default().get_clipboard()
+        clipboard.set(value.get_label() if isinstance(value, Gtk.Label) else value)
+
+    def ensure_edit_view(self) -> None:
+        if self.edit_view:
+            return
+        # Create a text view for edit mode
+        self.edit_view = Gtk.TextView()
+        self.edit_view.get_buffer().set_text(self.content)
+        self.edit_view.set_wrap_mode(Gtk.WrapMode.WORD)
+
+        # Create a scrolled window for the text editor
+        text_scrolled_window = Gtk.ScrolledWindow()
+        text_scrolled_window.set_vexpand(True)
+        text_scrolled_window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        text_scrolled_window.set_child(self.edit_view)
+
+        # Add the text editor to the stack
+        self.stack.add_titled(text_scrolled_window, "text", "Text Editor")
+
+    def on_edit_button_clicked(self, button) -> None:
+        self.edit_button.set_sensitive(False)
+        self.edit_mode = not self.edit_mode
+        if self.edit_mode:
+            self.edit_button.set_icon_name("emblem-ok-symbolic")
+            self.ensure_edit_view()
+            self.stack.set_visible_child_name("text")
+        else:
+            # If exiting edit mode, save the changes
+            buf = self.edit_view.get_buffer()
+            updated_content = buf.get_text(buf.get_start_iter(), buf.get_end_iter(), True)
+            if self.content != updated_content:
+                self.spinner.start()
+                self.pass_manager.run_async(self.pass_manager.save, self.get_title(), updated_content,
+                                            callback=lambda _: self.spinner.stop())
+
+                # Rebuild the grid with the updated content
+                new_grid_scrolled_window = self.build_grid(updated_content, self.pass_manager)
+
+                # Replace the old grid in the stack
+                self.stack.remove(self.grid_scrolled_window)
+                self.grid_scrolled_window = new_grid_scrolled_window
+                self.stack.add_titled(self.grid_scrolled_window, "grid", "Grid View")
+
+                # Replace the old content
+                self.content = updated_content
+
+            # switch to the grid view if not already visible
+            self.edit_button.set_icon_name("edit-symbolic")
+            self.stack.set_visible_child_name("grid")
+        self.edit_button.set_sensitive(True)
+
+
+class NewDialog(Gtk.Window):
+    def __init__(self, parent, path, pass_manager, config_manager):    
+        Gtk.Window.__init__(self, title='New password' if path == '.' else path, transient_for=parent, modal=True)
+        self.set_default_size(280, 250)
+        self.pass_manager = pass_manager
+
+        # Header
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        self.set_titlebar(header_bar)
+
+        # Save button
+        self.save_button = Gtk.Button()
+        self.save_button.set_icon_name("emblem-ok-symbolic")
+        self.save_button.set_sensitive(False)
+        self.save_button.connect("clicked", self.on_save_button_clicked)
+        header_bar.pack_start(self.save_button)
+
+        # Create a scrolled window for the text editor
+        window = Gtk.ScrolledWindow()
+        window.set_vexpand(True)
+        window.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+
+        # Organize widgets in a vertical box
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+
+        # Filename entry
+        self.filename = Gtk.Entry()
+        self.filename.set_placeholder_text("Enter file or account name")
+        self.filename.connect("changed", lambda entry: self.save_button.set_sensitive(bool(entry.get_text().strip())))
+        vbox.append(self.filename)
+
+        # Create a text view
+        self.view = Gtk.TextView()
+        self.view.set_wrap_mode(Gtk.WrapMode.WORD)
+        self.view.set_vexpand(True)
+
+        # Get the text buffer and set the text
+        buffer = self.view.get_buffer()
+
+        length = config_manager.settings.password_length
+        new_password = self.generate_password(length)
+
+        # Get the template and replace commas with new lines
+        comma_separated_text = config_manager.settings.template
+        template_text = comma_separated_text.replace(", ", "\n")
+
+        # Combine the new password and the template, separated by a newline
+        full_text = new_password + "\n" + template_text
+        buffer.set_text(full_text)
+        vbox.append(self.view)
+
+        # Add vbox to the scrolled window and add that to the window
+        window.set_child(vbox)
+        self.set_child(window)
+
+    def on_save_button_clicked(self, button):
+        # Retrieve the filename and password content and save it
+        filename = self.filename.get_text()
+        buffer = self.view.get_buffer()
+        start_iter, end_iter = buffer.get_bounds()
+        content = buffer.get_text(start_iter, end_iter, False)
+        
+        if self.get_title() != 'New password':
+            filename = os.path.join(self.get_title(), filename)
+        
+        self.save_button.set_sensitive(False)
+        self.pass_manager.run_async(self.pass_manager.add_password, filename, content,
+                                    callback=self.on_password_added)
+
+    def on_password_added(self, added):
+        if added:
+            self.close()
+        else:
+            self.save_button.set_sensitive(True)
+
+    @staticmethod
+    def generate_password(length=25) -> str:
+        alphabet = string.ascii_letters + string.digits + string.punctuation
+        password = ''.join(secrets.choice(alphabet) for i in range(length))
+
+        clipboard = Gdk.Display.get_default().get_clipboard()
+        clipboard.set(password)
+
+        return password
+
+
+class MoveDialog(Gtk.Window):
+    def __init__(self, parent, paths, folder, callback):
+        Gtk.Window.__init__(self, title=paths[0] if len(paths) == 1 else f'Move {len(paths)} items',
+                            transient_for=parent, modal=True)
+        self.set_default_size(280, -1)
+        self.callback = callback
+
+        # Header
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        self.set_titlebar(header_bar)
+
+        # Move button
+        move_button = Gtk.Button()
+        move_button.set_icon_name("emblem-ok-symbolic")
+        move_button.connect("clicked", self.on_move_button_clicked)
+        header_bar.pack_start(move_button)
+
+        # A folder to move into, a single item can also get a new name
+        self.destination = Gtk.Entry()
+        self.destination.set_placeholder_text("Folder" if len(paths) > 1 else "Folder or new name")
+        self.destination.set_text('' if folder == '.' else folder + '/')
+        self.destination.connect("activate", self.on_move_button_clicked)
+        self.destination.set_margin_start(6)
+        self.destination.set_margin_end(6)
+        self.destination.set_margin_top(6)
+        self.destination.set_margin_bottom(6)
+        self.set_child(self.destination)
+
+    def on_move_button_clicked(self, _):
+        self.callback(self.destination.get_text())
+        self.close()
+
+
+class ImportDialog(Gtk.Window):
+    def __init__(self, parent, source, folder, summary, callback):
+        Gtk.Window.__init__(self, title=f'Import {os.path.basename(source)}', transient_for=parent, modal=True)
+        self.set_default_size(320, 250)
+
+        # Header
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        self.set_titlebar(header_bar)
+
+        # Import button
+        import_button = Gtk.Button()
+        import_button.set_icon_name("emblem-ok-symbolic")
+        import_button.set_sensitive(summary['entries'] > len(summary['conflicts']))
+        import_button.connect("clicked", lambda _: (callback(), self.close()))
+        header_bar.pack_start(import_button)
+
+        # What the dry run found
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        target = 'the store' if folder == '.' else folder
+        vbox.append(Gtk.Label(label=f"{summary['entries'] - len(summary['conflicts'])} of {summary['entries']} entries will be imported into {target}",
+                              wrap=True))
+        if summary['conflicts']:
+            vbox.append(Gtk.Label(label=f"{len(summary['conflicts'])} already exist and are skipped:"))
+            conflicts = Gtk.TextView(editable=False, vexpand=True)
+            conflicts.get_buffer().set_text('\n'.join(summary['conflicts']))
+            window = Gtk.ScrolledWindow()
+            window.set_child(conflicts)
+            window.set_vexpand(True)
+            vbox.append(window)
+        vbox.set_margin_start(6)
+        vbox.set_margin_end(6)
+        vbox.set_margin_top(6)
+        vbox.set_margin_bottom(6)
+        self.set_child(vbox)
+
+
+class RemoveDialog(Gtk.Window):
+    def __init__(self, parent, paths, folders, callback):
+        items = f"{len(paths)} items" if len(paths) > 1 else paths[0]
+        Gtk.Window.__init__(self, title=f'Remove {items}', transient_for=parent, modal=True)
+        self.set_default_size(320, 250 if folders else -1)
+
+        # Header
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        self.set_titlebar(header_bar)
+
+        # Remove button
+        remove_button = Gtk.Button()
+        remove_button.set_icon_name("user-trash-symbolic")
+        remove_button.add_css_class("destructive-action")
+        remove_button.connect("clicked", lambda _: (callback(), self.close()))
+        header_bar.pack_start(remove_button)
+
+        # What goes, folders with everything in them
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        vbox.append(Gtk.Label(label=f"{items} will be removed from the store", wrap=True))
+        if folders:
+            count = f"{len(folders)} folders" if len(folders) > 1 else "1 folder"
+            vbox.append(Gtk.Label(label=f"Including {count} with everything in it:", wrap=True))
+            listing = Gtk.TextView(editable=False, vexpand=True)
+            listing.get_buffer().set_text('\n'.join(f"{folder}/" for folder in folders))
+            window = Gtk.ScrolledWindow()
+            window.set_child(listing)
+            window.set_vexpand(True)
+            vbox.append(window)
+        vbox.set_margin_start(6)
+        vbox.set_margin_end(6)
+        vbox.set_margin_top(6)
+        vbox.set_margin_bottom(6)
+        self.set_child(vbox)
+
+
+class RecipientsDialog(Gtk.Window):
+    def __init__(self, parent, folder, recipients, callback):
+        Gtk.Window.__init__(self, title='Password Store' if folder == '.' else folder, transient_for=parent, modal=True)
+        self.set_default_size(320, -1)
+        self.callback = callback
+
+        # Header
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        self.set_titlebar(header_bar)
+
+        # Re-encrypt button
+        self.reencrypt_button = Gtk.Button()
+        self.reencrypt_button.set_icon_name("emblem-ok-symbolic")
+        self.reencrypt_button.connect("clicked", self.on_reencrypt_button_clicked)
+        header_bar.pack_start(self.reencrypt_button)
+
+        # The keys of the folder's .gpg-id, the entries below it are encrypted again for them
+        self.recipients = Gtk.Entry()
+        self.recipients.set_placeholder_text("GPG key IDs or emails")
+        self.recipients.set_text(' '.join(sorted(recipients)))
+        self.recipients.connect("activate", self.on_reencrypt_button_clicked)
+        self.recipients.connect("changed", lambda entry: self.reencrypt_button.set_sensitive(bool(entry.get_text().split())))
+        self.recipients.set_margin_start(6)
+        self.recipients.set_margin_end(6)
+        self.recipients.set_margin_top(6)
+        self.recipients.set_margin_bottom(6)
+        self.set_child(self.recipients)
+
+    def on_reencrypt_button_clicked(self, _):
+        recipients = self.recipients.get_text().replace(',', ' ').split()
+        if recipients:
+            self.callback(recipients)
+            self.close()
+
+
+class AuditDialog(Gtk.Window):
+    # Many thousand rows would make the grid slow, the worst come first anyway
+    ROWS = 500
+    STRENGTHS = ["very weak", "weak", "fair", "strong", "very strong"]
+
+    def __init__(self, parent, pass_manager):
+        Gtk.Window.__init__(self, title="Audit", transient_for=parent, modal=True)
+        self.set_default_size(640, 480)
+        self.pass_manager = pass_manager
+        self.task = None
+        self.entries = {}
+        # Worst first: most issues, then the weakest
+        self.sort_key = lambda item: (-len(Auditor.issues(item[1])), item[1]['bits'], item[0])
+        self.sort_column = None
+        self.connect("close-request", self.on_close_request)
+
+        # Header
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        self.set_titlebar(header_bar)
+
+        self.refresh_button = Gtk.Button()
+        self.refresh_button.set_icon_name("view-refresh-symbolic")
+        self.refresh_button.set_tooltip_text("Decrypt and check every entry again")
+        self.refresh_button.connect("clicked", lambda _: self.start(True))
+        header_bar.pack_start(self.refresh_button)
+
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        vbox.set_margin_start(6)
+        vbox.set_margin_end(6)
+        vbox.set_margin_top(6)
+        vbox.set_margin_bottom(6)
+
+        self.progress_bar = Gtk.ProgressBar(show_text=True)
+        vbox.append(self.progress_bar)
+        self.status_label = Gtk.Label()
+        self.status_label.set_wrap(True)
+        vbox.append(self.status_label)
+
+        self.grid = Gtk.Grid()
+        self.grid.set_row_spacing(3)
+        self.grid.set_column_spacing(12)
+        scrolled_window = Gtk.ScrolledWindow()
+        scrolled_window.set_vexpand(True)
+        scrolled_window.set_child(self.grid)
+        vbox.append(scrolled_window)
+        self.set_child(vbox)
+        self.start(False)
+
+    def start(self, full):
+        self.refresh_button.set_sensitive(False)
+        self.progress_bar.set_visible(True)
+        self.progress_bar.set_fraction(0)
+        self.progress_bar.set_text("Checking which entries changed")
+        self.task = self.pass_manager.run_async(self.pass_manager.auditor.run, full, self.on_progress, callback=self.on_done,
+                                                interruptible=True)
+
+    def on_progress(self, done, total):
+        self.progress_bar.set_fraction(done / total)
+        self.progress_bar.set_text(f"{done} of {total} decrypted")
+        return GLib.SOURCE_REMOVE
+
+    def on_done(self, result):
+        self.task = None
+        self.refresh_button.set_sensitive(True)
+        self.progress_bar.set_visible(False)
+        if result is None:
+            self.status_label.set_label("The audit failed, see the output for details")
+            return
+        self.entries = {path: record for path, record in result['entries'].items() if Auditor.issues(record)}
+        counts = collections.Counter(issue for record in self.entries.values() for issue in Auditor.issues(record))
+        status = f"{len(result['entries'])} entries, {result['decrypted']} decrypted: " + \
+            ", ".join(f"{counts[issue]} {issue}" for issue in ('reused', 'short', 'weak', 'no OTP'))
+        if result['failed']:
+            status += f". {len(result['failed'])} could not be decrypted: {', '.join(sorted(result['failed'])[:5])}"
+        if result['uncompared']:
+            status += f". {result['uncompared']} entries were not compared for reuse this session, refresh to compare all"
+        self.status_label.set_label(status)
+        self.refresh()
+
+    def refresh(self):
+        for child in list(self.grid):
+            self.grid.remove(child)
+
+        columns = [
+            ("Entry", lambda item: item[0].lower()),
+            ("Reused", lambda item: -(item[1]['reused'] or 0)),
+            ("Length", lambda item: item[1]['length']),
+            ("Strength", lambda item: item[1]['bits']),
+            ("OTP", lambda item: item[1]['otp']),
+        ]
+        for column, (header, key) in enumerate(columns):
+            button = Gtk.Button(label=header + (" ▾" if self.sort_column == header else ""), has_frame=False, halign=Gtk.Align.START)
+            button.connect("clicked", self.on_header_clicked, header, key)
+            self.grid.attach(button, column, 0, 1, 1)
+
+        items = sorted(self.entries.items(), key=self.sort_key)[:self.ROWS]
+        for row, (path, record) in enumerate(items, start=1):
+            values = [path, "?" if record['reused'] is None else f"{record['reused']} others" if record['reused'] else "",
+                      str(record['length']), f"{self.STRENGTHS[record['score']]} ({record['bits']} bits)",
+                      "yes" if record['otp'] else "no"]
+            for column, value in enumerate(values):
+                self.grid.attach(Gtk.Label(label=value, halign=Gtk.Align.START), column, row, 1, 1)
+
+    def on_header_clicked(self, button, header, key):
+        self.sort_column = header
+        self.sort_key = lambda item: (key(item), item[0])
+        self.refresh()
+
+    def on_close_request(self, _):
+        if self.task:
+            self.task.cancel()
+        return False
+
+
+class Window(Gtk.ApplicationWindow):
+    def __init__(self, pass_manager, config_manager, application, **kwargs):
+        super().__init__(application=application, **kwargs)
+        self.pass_manager = pass_manager
+        self.config_manager = config_manager
+        # The decrypt or search that is still running for the current view
+        self.pending_task = None
+        self.busy_sources = set()
+        self.hover_position = None
+        self.hover_timeout = None
+        # The open import file chooser, a native chooser is not kept alive by GTK
+        self.import_chooser = None
+        # Names shown in the list, kept in step with the list model
+        self.items = []
+
+        self.set_default_size(300, 300)
+        application.create_action('search', self.on_search_button_clicked, ['<primary>f'])
+        application.create_action('newpwd', self.on_new_password_button_clicked, ['<primary>n'])
+        application.create_action('move', lambda *_: self.move_selected_items(), ['<primary>m'])
+        application.create_action('import', lambda *_: self.choose_import_file())
+        application.create_action('recipients', lambda *_: self.edit_recipients())
+        application.create_action('audit', lambda *_: AuditDialog(self, self.pass_manager).set_visible(True))
+
+        # Create a ListView, only the visible rows get widgets and those are recycled
+        self.store = Gtk.StringList()
+        self.selection = Gtk.MultiSelection(model=self.store)
+        self.selection.connect('selection-changed', self.on_selection_changed)
+        factory = Gtk.SignalListItemFactory()
+        factory.connect('setup', self.on_factory_setup)
+        factory.connect('bind', lambda _, list_item: list_item.get_child().set_label(list_item.get_item().get_string()))
+        self.list_view = Gtk.ListView(model=self.selection, factory=factory)
+        self.list_view.connect('activate', application.instrument('row-activated', self.on_row_activated))
+
+        # Create a back button
+        self.back_button = Gtk.Button()
+        self.back_button.connect('clicked', self.on_back_button_clicked)
+        self.back_button.set_icon_name("go-previous-symbolic")
+
+        # Create a header bar
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        header_bar.pack_start(self.back_button)
+        self.set_titlebar(header_bar)
+
+        # Create the search entry
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_search_delay(100)
+        self.search_entry.connect("search-changed", application.instrument('search-changed', self.on_search_changed))
+        self.search_entry.connect("activate", application.instrument('search-activate', self.on_search_entry_activate))
+
+        # Create the search bar and connect it to the search entry
+        self.search_bar = Gtk.SearchBar()
+        self.search_bar.set_child(self.search_entry)
+        self.search_bar.connect_entry(self.search_entry)
+
+        # Create a search button
+        self.search_button = Gtk.ToggleButton()
+        self.search_button.connect('toggled', self.on_search_button_clicked)
+        self.search_button.set_icon_name("edit-find-symbolic")
+        header_bar.pack_start(self.search_button)
+
+        # Create menu button
+        menu_button = Gtk.MenuButton()
+        menu_button.set_icon_name("open-menu-symbolic")
+        header_bar.pack_end(menu_button)
+
+        # Create a 'New Password' button
+        self.new_password_button = Gtk.Button()
+        self.new_password_button.set_icon_name("document-new-symbolic")
+        self.new_password_button.connect('clicked', self.on_new_password_button_clicked)
+        header_bar.pack_start(self.new_password_button)
+
+        # Show a spinner while pass, gpg or git are working in the background
+        self.spinner = Gtk.Spinner()
+        header_bar.pack_end(self.spinner)
+        self.pass_manager.runner.busy_listeners.append(lambda busy: self.set_busy(busy, 'runner'))
+
+        # Show whether changes are waiting, being pushed or failed to synchronise
+        self.sync_icon = Gtk.Image()
+        self.sync_icon.set_visible(False)
+        header_bar.pack_end(self.sync_icon)
+        self.pass_manager.sync_engine.listeners.append(self.on_sync_state)
+        self.pass_manager.store_listeners.append(self.on_store_changed)
+
+        # Create menu model
+        menu_model = Gio.Menu()
+        menu_model.append("Move selected", "app.move")
+        menu_model.append("Import", "app.import")
+        menu_model.append("Recipients", "app.recipients")
+        menu_model.append("Audit passwords", "app.audit")
+        menu_model.append("Synchronise", "app.synchronise")
+        # menu_model.append("Reload", "app.reload")
+        menu_model.append("Preferences", "app.preferences")
+        menu_model.append("Diagnostics", "app.diagnostics")
+        menu_model.append("About", "app.about")
+        menu_model.append("Quit", "app.quit")
+        menu_button.set_menu_model(menu_model)
+
+        # Create a scrolled window
+        scrolled_window = Gtk.ScrolledWindow()
+        scrolled_window.set_child(self.list_view)
+        
+        # Create a vertical box and pack the search bar and scrolled window into it
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        vbox.append(self.search_bar)
+        vbox.append(scrolled_window)
+
+        # Shows how far a bulk delete or move got
+        self.progress_bar = Gtk.ProgressBar(show_text=True)
+        self.progress_bar.set_visible(False)
+        vbox.append(self.progress_bar)
+        scrolled_window.set_vexpand(True)
+        self.set_child(vbox)
+
+        # Start with the names of the previous session, the store is indexed in the background
+        self.current_folder = '.'
+        if self.pass_manager.index.tree is None:
+            self.load_folder(self.current_folder, self.pass_manager.load_listing() or [])
+            self.pass_manager.run_async(self.pass_manager.build_index, callback=self.on_index_built)
+        else:
+            self.load_folder(self.current_folder)
+            self.pass_manager.watcher.start()
+
+        # Shortcuts
+        application.create_action('reload', lambda *_: self.reload(), ['<primary>r'])
+
+        key_controller = Gtk.EventControllerKey()
+        key_controller.connect("key-pressed", lambda controller, keyval, keycode, state: self.delete_selected_items() if keyval == Gdk.KEY_Delete else None)
+        self.add_controller(key_controller)
+    
+    def set_busy(self, busy, source):
+        if busy:
+            self.busy_sources.add(source)
+        else:
+            self.busy_sources.discard(source)
+        if self.busy_sources:
+            self.spinner.start()
+        else:
+            self.spinner.stop()
+
+    def on_factory_setup(self, factory, list_item):
+        label = Gtk.Label()
+        list_item.set_child(label)
+
+        # Start decrypting the row under the pointer once it rests there briefly
+        motion_controller = Gtk.EventControllerMotion()
+        motion_controller.connect('enter', lambda *_: self.on_row_hover(list_item.get_position()))
+        label.add_controller(motion_controller)
+
+        # One click opens the row like the list box did, Ctrl and Shift clicks are left to the view to select
+        click = Gtk.GestureClick()
+        click.set_propagation_phase(Gtk.PropagationPhase.CAPTURE)
+        click.connect('pressed', self.on_row_pressed)
+        click.connect('released', self.on_row_released, list_item)
+        label.add_controller(click)
+
+    @staticmethod
+    def selecting(gesture) -> bool:
+        return bool(gesture.get_current_event_state() & (Gdk.ModifierType.CONTROL_MASK | Gdk.ModifierType.SHIFT_MASK))
+
+    def on_row_pressed(self, gesture, n_press, x, y):
+        # Claimed, the view does not see the click, so a double click does not open the row a second time
+        if not self.selecting(gesture):
+            gesture.set_state(Gtk.EventSequenceState.CLAIMED)
+
+    def on_row_released(self, gesture, n_press, x, y, list_item):
+        if n_press == 1 and not self.selecting(gesture):
+            # Through the view's action, so it runs as the instrumented activate handler like Enter does
+            self.list_view.activate_action('list.activate-item', GLib.Variant('u', list_item.get_position()))
+
+    def set_items(self, items):
+        # Splice only the changed middle of the list into the model
+        old = self.items
+        prefix = 0
+        while prefix < len(old) and prefix < len(items) and old[prefix] == items[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < len(old) - prefix and suffix < len(items) - prefix and old[-suffix - 1] == items[-suffix - 1]:
+            suffix += 1
+        old_middle = old[prefix:len(old) - suffix]
+        new_middle = items[prefix:len(items) - suffix]
+
+        if len(old_middle) * len(new_middle) <= 250000:
+            # Small enough for a finer diff, applied back to front so positions stay valid
+            import difflib
+            matcher = difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+            for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+                if tag != 'equal':
+                    self.store.splice(prefix + i1, i2 - i1, new_middle[j1:j2])
+        else:
+            self.store.splice(prefix, len(old_middle), new_middle)
+        self.items = list(items)
+
+    def on_sync_state(self, state, description):
+        icons = {
+            SyncEngine.PENDING: "document-save-symbolic",
+            SyncEngine.SYNCING: "emblem-synchronizing-symbolic",
+            SyncEngine.RETRYING: "dialog-warning-symbolic",
+            SyncEngine.FAILED: "dialog-error-symbolic",
+        }
+        self.sync_icon.set_visible(state in icons)
+        self.sync_icon.set_from_icon_name(icons.get(state))
+        self.sync_icon.set_tooltip_text(description)
+
+    def on_store_changed(self, paths):
+        # Only refresh the visible list when a change touches it
+        if self.get_title() == 'Password Search':
+            if self.search_entry.get_text().strip():
+                self.on_search_changed(self.search_entry)
+            return
+        if self.current_folder != '.' and not self.pass_manager.is_folder(self.current_folder):
+            self.load_folder('.')
+            return
+        prefix = '' if self.current_folder == '.' else self.current_folder + '/'
+        if paths is None or any(path.startswith(prefix) for path in paths):
+            self.set_items(self.pass_manager.list_passwords(self.current_folder) or [])
+
+    def item_path(self, position):
+        selected_item = self.items[position]
+        return self.current_folder + '/' + selected_item if self.current_folder != '.' else selected_item
+
+    def prefetch(self, position, hover=False):
+        if position is None or position >= len(self.items):
+            return
+        neighbours = self.config_manager.settings.prefetch_neighbours
+        positions = range(max(0, position - neighbours), min(len(self.items), position + neighbours + 1))
+        paths = [self.item_path(position) for position in positions]
+        self.pass_manager.decrypt_pool.prefetch([path for path in paths if not self.pass_manager.is_folder(path)], hover)
+
+    def on_row_hover(self, position):
+        if position == self.hover_position:
+            return
+        self.hover_position = position
+        if self.hover_timeout:
+            GLib.source_remove(self.hover_timeout)
+        self.hover_timeout = GLib.timeout_add(150, self.on_hover_timeout)
+
+    def on_hover_timeout(self):
+        self.hover_timeout = None
+        self.prefetch(self.hover_position, hover=True)
+        return GLib.SOURCE_REMOVE
+
+    def on_index_built(self, _):
+        folder = Reencryptor(self.pass_manager).pending()
+        if folder is not None:
+            self.run_reencrypt(folder)
+        if self.current_folder == '.' and not self.search_entry.get_text():
+            self.set_items(self.pass_manager.list_passwords('.') or [])
+        self.pass_manager.watcher.start()
+        self.get_application().mark_startup('index')
+
+    def reload(self):
+        self.pass_manager.reload()
+        self.pass_manager.watcher.start()
+        self.load_folder(self.current_folder)
+
+    def selected_paths(self):
+        selection = self.selection.get_selection()
+        positions = (selection.get_nth(i) for i in range(selection.get_size()))
+        return [self.item_path(position) for position in positions if position < len(self.items)]
+
+    def on_selection_changed(self, selection, *_):
+        # Prefetch only what was picked on its own, not every row of a multi-selection
+        if selection.get_selection().get_size() == 1:
+            self.prefetch(selection.get_selection().get_nth(0))
+
+    def delete_selected_items(self):
+        paths = self.selected_paths()
+        if not paths:
+            return
+        # Folders go with everything in them, they and batches are confirmed first
+        folders = [path for path in paths if self.pass_manager.is_folder(path)]
+        if len(paths) == 1 and not folders:
+            self.run_bulk(paths, 'removed', self.pass_manager.bulk_remove, paths)
+            return
+        dialog = RemoveDialog(self, paths, folders,
+                              lambda: self.run_bulk(paths, 'removed', self.pass_manager.bulk_remove, paths))
+        dialog.set_visible(True)
+
+    def move_selected_items(self):
+        paths = self.selected_paths()
+        if paths:
+            dialog = MoveDialog(self, paths, self.current_folder,
+                                lambda destination: self.run_bulk(paths, 'moved', self.pass_manager.bulk_move,
+                                                                  paths, destination))
+            dialog.set_visible(True)
+
+    def run_bulk(self, paths, verb, function, *args):
+        # The whole batch is one task with one commit, the list follows through on_store_changed
+        self.selection.unselect_all()
+        self.on_bulk_progress(0, len(paths))
+        self.progress_bar.set_visible(True)
+        self.pass_manager.run_async(function, *args, self.on_bulk_progress,
+                                    callback=lambda failed: self.on_bulk_done(failed, verb, len(paths)))
+
+    def on_bulk_progress(self, done, total):
+        # An import does not know its total up front
+        if total:
+            self.progress_bar.set_fraction(done / total)
+            self.progress_bar.set_text(f"{done} of {total}")
+        else:
+            self.progress_bar.pulse()
+            self.progress_bar.set_text(f"{done} done")
+        return GLib.SOURCE_REMOVE
+
+    def edit_recipients(self):
+        folder = self.current_folder
+        dialog = RecipientsDialog(self, folder, self.pass_manager.recipients(folder),
+                                  lambda recipients: self.run_reencrypt(folder, recipients))
+        dialog.set_visible(True)
+
+    def run_reencrypt(self, folder, recipients=None):
+        # Without recipients an interrupted run is continued
+        reencryptor = Reencryptor(self.pass_manager)
+
+        def reencrypt(progress):
+            if recipients:
+                reencryptor.set_recipients(folder, recipients)
+            return reencryptor.run(folder, progress)
+
+        self.on_bulk_progress(0, None)
+        self.progress_bar.set_visible(True)
+        # Interrupted on quit, the next start continues it
+        self.pass_manager.run_async(reencrypt, self.on_bulk_progress, callback=self.on_reencrypt_done, interruptible=True)
+
+    def on_reencrypt_done(self, result):
+        self.progress_bar.set_visible(False)
+        if result is None:
+            self.pass_manager.notification("The re-encryption failed, see the output for details", "error")
+            return
+        self.on_bulk_done(result['failed'], 're-encrypted', result['entries'] + result['skipped'] + len(result['failed']))
+
+    def choose_import_file(self):
+        chooser = Gtk.FileChooserNative(title="Import passwords", transient_for=self, action=Gtk.FileChooserAction.OPEN)
+        export_filter = Gtk.FileFilter(name="CSV, KeePass XML or Bitwarden JSON")
+        for pattern in ('*.csv', '*.xml', '*.json'):
+            export_filter.add_pattern(pattern)
+        chooser.add_filter(export_filter)
+        chooser.connect("response", self.on_import_file_chosen)
+        self.import_chooser = chooser
+        chooser.show()
+
+    def on_import_file_chosen(self, chooser, response):
+        self.import_chooser = None
+        if response != Gtk.ResponseType.ACCEPT:
+            return
+        source = chooser.get_file().get_path()
+        folder = self.current_folder
+        importer = Importer(self.pass_manager)
+        prefix = '' if folder == '.' else folder
+        # A dry run first, nothing is written until the conflicts were seen
+        self.pass_manager.run_async(self.dry_run_import, importer, source, prefix,
+                                    callback=lambda summary: self.on_import_checked(importer, source, folder, summary))
+
+    def dry_run_import(self, importer, source, prefix):
+        try:
+            return importer.dry_run(source, prefix)
+        # ElementTree.ParseError is a SyntaxError, xml is not imported for it
+        except (OSError, ValueError, SyntaxError) as e:
+            self.pass_manager.notification(f"Could not read {os.path.basename(source)}: {e}", "error")
+            return None
+
+    def on_import_checked(self, importer, source, folder, summary):
+        if summary is None:
+            return
+        prefix = '' if folder == '.' else folder
+        dialog = ImportDialog(self, source, folder, summary, lambda: self.run_import(importer, source, prefix))
+        dialog.set_visible(True)
+
+    def run_import(self, importer, source, prefix):
+        self.on_bulk_progress(0, None)
+        self.progress_bar.set_visible(True)
+        # Interrupted on quit, what was imported until then is committed
+        self.pass_manager.run_async(importer.run, source, prefix, self.on_bulk_progress, callback=self.on_import_done,
+                                    interruptible=True)
+
+    def on_import_done(self, result):
+        self.progress_bar.set_visible(False)
+        if result is None:
+            self.pass_manager.notification("The import failed, see the output for details", "error")
+            return
+        self.on_bulk_done(result['failed'], 'imported', result['entries'] + len(result['failed']))
+
+    def on_bulk_done(self, failed, verb, total):
+        self.progress_bar.set_visible(False)
+        if not failed:
+            return
+        for path, reason in failed.items():
+            print(f"Error: {path or 'commit'}: {reason}")
+        failed_paths = [path for path in failed if path]
+        if failed_paths:
+            message = f"{len(failed_paths)} of {total} could not be {verb}: {', '.join(failed_paths[:3])}"
+            self.pass_manager.notification(message + (' …' if len(failed_paths) > 3 else ''))
+        else:
+            self.pass_manager.notification(f"The {verb} entries could not be committed")
+
+    def on_back_button_clicked(self, _):
+        parent_folder = '/'.join(self.current_folder.split('/')[:-1]) if '/' in self.current_folder else '.'
+        self.load_folder(parent_folder)
+
+    def on_new_password_button_clicked(self, button, _ = None):
+        dialog = NewDialog(self, self.current_folder, self.pass_manager, self.config_manager)
+        dialog.connect("close_request", lambda *_: self.load_folder(self.current_folder))
+        dialog.set_visible(True)
+
+    def on_search_button_clicked(self, button, _ = None):
+        # Toggle search mode
+        search_mode = not self.search_bar.get_search_mode()
+        self.search_bar.set_search_mode(search_mode)
+
+        # If search mode is active, grab focus to the search entry
+        if search_mode:
+            self.search_entry.grab_focus()
+            # Have the search index ready by the time the first key is typed
+            if self.pass_manager.settings.use_folder and self.pass_manager.search_index is None:
+                self.pass_manager.run_async(self.pass_manager.ensure_search_index)
+            self.back_button.set_icon_name("go-previous-symbolic")
+        else:
+            self.search_button.set_icon_name("edit-find-symbolic")
+
+    def on_search_changed(self, entry):
+        # Search as you type, the entry already debounces this signal
+        query = entry.get_text()
+        if not query.strip():
+            if self.get_title() == 'Password Search':
+                self.load_folder('.')
+            return
+        self.current_folder = '.'
+        self.back_button.set_visible(True)
+        self.set_title('Password Search')
+
+        self.cancel_pending_task()
+        if not self.pass_manager.settings.use_folder or self.pass_manager.search_index is None:
+            # pass find and the first search, which builds the index, stay off the main loop
+            self.pending_task = self.pass_manager.run_async(self.pass_manager.search, query,
+                                                            callback=self.show_search_results)
+        else:
+            self.show_search_results(self.pass_manager.search(query))
+
+    def on_search_entry_activate(self, entry):
+        self.search_button.set_icon_name("edit-find-symbolic")
+        self.search_button.set_visible(False)
+        self.search_button.set_active(False)
+        self.search_bar.set_search_mode(False)
+        if not self.pending_task:
+            self.on_search_changed(entry)
+
+    def show_search_results(self, folder_contents):
+        self.pending_task = None
+        self.set_items(folder_contents or [])
+
+    def load_folder(self, folder, items=None):
+        # Navigating away drops whatever was still being fetched for the old view
+        self.cancel_pending_task()
+        self.pass_manager.decrypt_pool.clear()
+        self.hover_position = None
+        self.current_folder = folder
+        self.set_title(folder if folder != '.' else 'Password Store')
+
+        # Hide or show the back button based on whether on root
+        is_root = folder == '.'
+        self.back_button.set_visible(not is_root)
+        self.search_button.set_visible(is_root)
+
+        self.selection.unselect_all()
+        if items is None:
+            items = self.pass_manager.list_passwords(folder) or []
+        self.set_items(items)
+
+    def on_row_activated(self, list_view, position):
+        # Check if the selected item is a folder in the store index
+        item_path = self.item_path(position)
+        if self.pass_manager.is_folder(item_path):
+            # Navigate into the folder
+            self.load_folder(item_path)
+        else:
+            # Take the prefetched content, or wait for the decrypt pool to finish it
+            self.cancel_pending_task()
+            self.set_busy(True, 'decrypt')
+            show_password_dialog = self.get_application().instrument('show-password-dialog', self.show_password_dialog)
+            self.pending_task = self.pass_manager.decrypt_pool.get(item_path, lambda content: show_password_dialog(content, item_path))
+
+    def cancel_pending_task(self):
+        if self.pending_task:
+            self.pending_task.cancel()
+            self.pending_task = None
+        self.set_busy(False, 'decrypt')
+
+    def show_password_dialog(self, content, title):
+        self.pending_task = None
+        self.set_busy(False, 'decrypt')
+        if content is None:
+            self.pass_manager.notification(f'Failed to decrypt {title}')
+            return
+        dialog = Dialog(self, title, content, self.pass_manager)
+        dialog.set_visible(True)
+
+
+class Diagnostics(Gtk.Window):
+    def __init__(self, parent, tracer):
+        Gtk.Window.__init__(self, title="Diagnostics", transient_for=parent, modal=True)
+        self.set_default_size(560, 300)
+        self.tracer = tracer
+
+        # Header
+        header_bar = Gtk.HeaderBar()
+        header_bar.set_show_title_buttons(True)
+        self.set_titlebar(header_bar)
+
+        # Turn tracing on or off for this session
+        self.trace_switch = Gtk.Switch()
+        self.trace_switch.set_active(tracer.enabled)
+        self.trace_switch.set_tooltip_text("Trace external commands")
+        self.trace_switch.connect("state-set", self.on_trace_switch_set)
+        header_bar.pack_start(self.trace_switch)
+
+        refresh_button = Gtk.Button()
+        refresh_button.set_icon_name("view-refresh-symbolic")
+        refresh_button.connect("clicked", lambda _: self.refresh())
+        header_bar.pack_start(refresh_button)
+
+        save_button = Gtk.Button()
+        save_button.set_icon_name("document-save-symbolic")
+        save_button.set_tooltip_text("Write the statistics to a JSON file")
+        save_button.connect("clicked", self.on_save_button_clicked)
+        header_bar.pack_end(save_button)
+
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        vbox.set_margin_start(6)
+        vbox.set_margin_end(6)
+        vbox.set_margin_top(6)
+        vbox.set_margin_bottom(6)
+
+        self.status_label = Gtk.Label()
+        self.status_label.set_wrap(True)
+        self.status_label.set_selectable(True)
+        vbox.append(self.status_label)
+
+        self.grid = Gtk.Grid()
+        self.grid.set_row_spacing(3)
+        self.grid.set_column_spacing(12)
+        scrolled_window = Gtk.ScrolledWindow()
+        scrolled_window.set_vexpand(True)
+        scrolled_window.set_child(self.grid)
+        vbox.append(scrolled_window)
+        self.set_child(vbox)
+        self.refresh()
+
+    def refresh(self) -> None:
+        for child in list(self.grid):
+            self.grid.remove(child)
+
+        if not self.tracer.enabled:
+            self.status_label.set_label("Tracing is off, turn it on here or start with PYPASS_TRACE=1.")
+        else:
+            self.status_label.set_label("Send SIGUSR1 to write the statistics to the cache folder.")
+
+        headers = ["Command", "Count", "Failed", "Mean", "p50", "p95", "Max", "In", "Out"]
+        for column, header in enumerate(headers):
+            self.grid.attach(Gtk.Label(label=header, halign=Gtk.Align.START), column, 0, 1, 1)
+
+        commands = self.tracer.snapshot()['commands']
+        for row, (name, stats) in enumerate(sorted(commands.items()), start=1):
+            values = [name, str(stats['count']), str(stats['failures']),
+                      f"{stats['mean_ms']:.0f} ms", f"≤{stats['p50_ms']} ms", f"≤{stats['p95_ms']} ms",
+                      f"{stats['max_ms']:.0f} ms", GLib.format_size(stats['bytes_in']), GLib.format_size(stats['bytes_out'])]
+            for column, value in enumerate(values):
+                self.grid.attach(Gtk.Label(label=value, halign=Gtk.Align.START), column, row, 1, 1)
+
+    def on_trace_switch_set(self, switch, state) -> bool:
+        self.tracer.enabled = state
+        self.refresh()
+        return False
+
+    def on_save_button_clicked(self, button) -> None:
+        self.status_label.set_label(f"Written to {self.tracer.dump()}")
+
+
+class Preferences(Gtk.Window):
+    def __init__(self, parent, config_manager):
+        Gtk.Window.__init__(self, title="Preferences", transient_for=parent, modal=True)
+        self.config_manager = config_manager
+
+        # Get the content area directly
+        grid = Gtk.Grid()
+        grid.set_row_spacing(12)
+        grid.set_column_spacing(6)
+        grid.set_halign(Gtk.Align.CENTER)
+        grid.set_valign(Gtk.Align.CENTER)
+        grid.set_margin_start(6)
+        grid.set_margin_end(6)
+        grid.set_margin_top(6)
+        grid.set_margin_bottom(6)
+
+        # Password Store Path
+        logo1 = Gtk.Image.new_from_icon_name("folder-symbolic")
+        grid.attach(logo1, 0, 0, 1, 1)
+
+        path_label = Gtk.Label(label="Password Store Path:")
+        grid.attach(path_label, 1, 0, 1, 1)
+
+        self.path_entry = Gtk.Entry()
+        self.path_entry.set_text(self.config_manager.settings.password_store_path)
+        # A half typed path would be indexed, so the path is taken on Enter or when closing
+        self.path_entry.connect("activate", self.on_path_entry_activate)
+        self.connect("close-request", self.on_path_entry_activate)
+        grid.attach(self.path_entry, 0, 1, 6, 1)
+
+        # Filter Valid Files
+        logo2 = Gtk.Image.new_from_icon_name("security-medium-symbolic")
+        grid.attach(logo2, 0, 2, 1, 1)
+
+        filter_label = Gtk.Label(label="Hide invalid files:")
+        grid.attach(filter_label, 1, 2, 1, 1)
+
+        self.filter_switch = Gtk.Switch()
+        self.filter_switch.set_active(self.config_manager.settings.filter_valid_files)
+        self.filter_switch.connect("notify::active", self.on_switch_active, 'filter_valid_files')
+        grid.attach(self.filter_switch, 2, 2, 2, 1)
+
+        # auto sync
+        logo3 = Gtk.Image.new_from_icon_name("emblem-synchronizing-symbolic")
+        grid.attach(logo3, 0, 3, 1, 1)
+
+        sync_label = Gtk.Label(label="automatically synchronize:")
+        grid.attach(sync_label, 1, 3, 1, 1)
+
+        self.sync_switch = Gtk.Switch()
+        self.sync_switch.set_active(self.config_manager.settings.auto_sync)
+        self.sync_switch.connect("notify::active", self.on_switch_active, 'auto_sync')
+        grid.attach(self.sync_switch, 2, 3, 2, 1)
+
+        # Use filesystem instead of pass
+        logo4 = Gtk.Image.new_from_icon_name("edit-find-symbolic")
+        grid.attach(logo4, 0, 4, 1, 1)
+
+        folder_label = Gtk.Label(label="Use improved search:")
+        grid.attach(folder_label, 1, 4, 1, 1)
+
+        self.folder_switch = Gtk.Switch()
+        self.folder_switch.set_active(self.config_manager.settings.use_folder)
+        self.folder_switch.connect("notify::active", self.on_switch_active, 'use_folder')
+        grid.attach(self.folder_switch, 2, 4, 2, 1)
+
+        fuzzy_label = Gtk.Label(label="Fuzzy search:")
+        grid.attach(fuzzy_label, 1, 5, 1, 1)
+
+        self.fuzzy_switch = Gtk.Switch()
+        self.fuzzy_switch.set_active(self.config_manager.settings.fuzzy_search)
+        self.fuzzy_switch.connect("notify::active", self.on_switch_active, 'fuzzy_search')
+        grid.attach(self.fuzzy_switch, 2, 5, 2, 1)
+        self.set_child(grid)
+
+        # Template for creating a new password file
+        logo5 = Gtk.Image.new_from_icon_name("document-new-symbolic")
+        grid.attach(logo5, 0, 6, 1, 1)
+
+        template_label = Gtk.Label(label="New password template:")
+        grid.attach(template_label, 1, 6, 1, 1)
+
+        self.template_entry = Gtk.Entry()
+        self.template_entry.set_text(self.config_manager.settings.template)
+        self.template_entry.connect("changed", lambda entry: self.update_setting('template', entry.get_text()))
+        grid.attach(self.template_entry, 0, 7, 6, 1)
+
+        template_info_label = Gtk.Label(label="(comma separated list)")
+        grid.attach(template_info_label, 0, 8, 6, 1)
+
+        # Generate new password (disable with 0)
+        logo6 = Gtk.Image.new_from_icon_name("com.github.noobping.pypass")
+        grid.attach(logo6, 0, 9, 1, 1)
+
+        password_label = Gtk.Label(label="New password length:")
+        grid.attach(password_label, 1, 9, 1, 1)
+
+        default_password_length = self.config_manager.settings.password_length
+        adjustment = Gtk.Adjustment(lower=8, upper=512, step_increment=1, page_increment=10, value=default_password_length)
+        self.spin_button = Gtk.SpinButton(adjustment=adjustment, climb_rate=1, digits=0)
+        self.spin_button.connect("value-changed", lambda button: self.update_setting('password_length', button.get_value_as_int()))
+        grid.attach(self.spin_button, 0, 10, 6, 1)
+
+    def update_setting(self, key, value):
+        # The file is written once the changes stop
+        try:
+            self.config_manager.update(**{key: value})
+        except ValueError as e:
+            print(f"Error: {e}")
+
+    def on_switch_active(self, switch, _, key):
+        self.update_setting(key, switch.get_active())
+
+    def on_path_entry_activate(self, *_):
+        if self.path_entry.get_text() != self.config_manager.settings.password_store_path:
+            self.update_setting('password_store_path', self.path_entry.get_text())
+        return False
+
+
+class Application(Gtk.Application):
+    """The main application singleton class."""
+
+    def __init__(self):
+        super().__init__(application_id='com.github.noobping.pypass',
+                         flags=Gio.ApplicationFlags.DEFAULT_FLAGS)
+        self.profiler = None
+        self.watchdog = StallWatchdog()
+        # Milliseconds since the process started per start up step, only with --startup-time
+        self.startup_marks = None
+        self.add_main_option('profile', 0, GLib.OptionFlags.NONE, GLib.OptionArg.NONE,
+                             'Profile every action and write per-action reports on quit', None)
+        self.add_main_option('stall-threshold', 0, GLib.OptionFlags.NONE, GLib.OptionArg.INT,
+                             'Log main loop stalls longer than this many ms (0 turns it off, default 250)', 'MS')
+        self.add_main_option('startup-time', 0, GLib.OptionFlags.NONE, GLib.OptionArg.NONE,
+                             'Print how long the first frame and the store index took, then quit', None)
+        self.create_action('quit', lambda *_: self.quit(), ['<primary>q'])
+        self.create_action('about', self.on_about_action, ['<primary>a'])
+        self.create_action('preferences', self.on_preferences_action, ['<primary>p'])
+        self.create_action('diagnostics', self.on_diagnostics_action)
+
+        # Initialize PassWrapper
+        self.config_manager = ConfigManager()
+        self.pass_manager = PassWrapper(self.config_manager)
+        self.create_action('synchronise', lambda *_: self.pass_manager.sync(), ['<primary>s'])
+
+        # Write the command trace on SIGUSR1
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1, self.on_dump_signal)
+
+        # Forget decrypted entries when the session gets locked
+        self.set_property('register-session', True)
+        self.connect('notify::screensaver-active', self.on_screensaver_active)
+
+    def do_handle_local_options(self, options):
+        if options.contains('profile'):
+            directory = user_cache_file(time.strftime('profile-%Y%m%d-%H%M%S'))
+            self.profiler = ActionProfiler(directory)
+        if options.contains('stall-threshold'):
+            threshold = options.lookup_value('stall-threshold').get_int32()
+            self.watchdog = StallWatchdog(threshold) if threshold > 0 else None
+        if options.contains('startup-time'):
+            self.startup_marks = {}
+        return -1
+
+    def do_startup(self):
+        Gtk.Application.do_startup(self)
+        if self.watchdog:
+            self.watchdog.start()
+
+    def instrument(self, name, callback):
+        """Wrap a signal handler so stalls and profiles name it.
+
+        Args:
+            name: the name reported for the handler
+            callback: the handler to wrap
+        """
+        def wrapper(*args):
+            watchdog = self.watchdog
+            previous = watchdog.current if watchdog else None
+            if watchdog:
+                watchdog.current = name
+            try:
+                if self.profiler:
+                    return self.profiler.run(name, callback, *args)
+                return callback(*args)
+            finally:
+                if watchdog:
+                    watchdog.current = previous
+        return wrapper
+
+    def mark_startup(self, name):
+        if self.startup_marks is None or name in self.startup_marks:
+            return
+        self.startup_marks[name] = round(startup_elapsed(), 1)
+        if {'first_paint', 'index'} <= self.startup_marks.keys():
+            print(json.dumps(self.startup_marks))
+            self.quit()
+
+    def after_first_paint(self, window, callback):
+        # The frame clock exists once the window is realized
+        clock = window.get_frame_clock()
+        if clock is None:
+            GLib.idle_add(callback)
+            return
+        handler = None
+
+        def on_after_paint(clock):
+            clock.disconnect(handler)
+            callback()
+        handler = clock.connect('after-paint', on_after_paint)
+
+    def on_first_paint(self):
+        self.mark_startup('first_paint')
+        # Measuring start up leaves the network alone
+        if self.startup_marks is None:
+            self.pass_manager.sync()
+
+    def on_screensaver_active(self, *_):
+        if self.get_property('screensaver-active'):
+            self.pass_manager.decrypt_cache.clear()
+            self.pass_manager.decrypt_pool.clear()
+            self.pass_manager.auditor.forget()
+
+    def do_activate(self):
+        """Called when the application is activated.
+
+        We raise the application's main window, creating it if
+        necessary.
+        """
+        win = self.props.active_window
+        if win:
+            win.present()
+            return
+        win = Window(pass_manager=self.pass_manager, config_manager=self.config_manager, application=self)
+        self.mark_startup('window')
+        win.present()
+        # Synchronise once the window shows something
+        self.after_first_paint(win, self.on_first_paint)
+
+    def do_shutdown(self):
+        # Let running saves and pushes finish before the process exits, audits, imports and re-encryption stop
+        self.pass_manager.watcher.stop()
+        self.pass_manager.decrypt_pool.shutdown()
+        self.pass_manager.runner.shutdown()
+        self.pass_manager.sync_engine.flush()
+        self.pass_manager.save_listing()
+        self.config_manager.flush()
+        if self.pass_manager.tracer.enabled:
+            print(f"Command trace written to {self.pass_manager.tracer.dump()}")
+        self.pass_manager.decrypt_cache.clear()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.profiler:
+            for report in self.profiler.write_reports():
+                print(f"Profile written to {report}")
+        Gtk.Application.do_shutdown(self)
+
+    def on_about_action(self, widget, _):
+        """Callback for the app.about action."""
+        about = Gtk.AboutDialog(transient_for=self.props.active_window,
+                                modal=True,
+                                program_name='Password Store',
+                                logo_icon_name='com.github.noobping.pypass',
+                                version='0.1.0',
+                                license_type=Gtk.License.GPL_3_0,
+                                authors=['noobping'],
+                                copyright='© 2023 noobping')
+        about.present()
+
+    def on_diagnostics_action(self, widget, _):
+        dialog = Diagnostics(self.props.active_window, self.pass_manager.tracer)
+        dialog.set_visible(True)
+
+    def on_dump_signal(self):
+        if self.pass_manager.tracer.enabled:
+            print(f"Command trace written to {self.pass_manager.tracer.dump()}")
+        return GLib.SOURCE_CONTINUE
+
+    def on_preferences_action(self, widget, _):
+        dialog = Preferences(self.props.active_window, self.config_manager)
+        dialog.set_visible(True)
+
+    def create_action(self, name, callback, shortcuts=None):
+        """Add an application action.
+
+        Args:
+            name: the name of the action
+            callback: the function to be called when the action is
+              activated
+            shortcuts: an optional list of accelerators
+        """
+        action = Gio.SimpleAction.new(name, None)
+        action.connect("activate", self.instrument(f"app.{name}", callback))
+        self.add_action(action)
+        if shortcuts:
+            self.set_accels_for_action(f"app.{name}", shortcuts)